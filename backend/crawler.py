@@ -1,15 +1,22 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import urljoin, urlparse
-from collections import deque
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import json
+import functools
+import hashlib
+import sqlite3
+import atexit
 import os
+import shutil
+import tempfile
 import time
 import re
 from threading import Lock
-from sentence_transformers import SentenceTransformer, util
-from keybert import KeyBERT
 import numpy as np
+import ahocorasick
 
 # -------------------------------
 # Configuration
@@ -17,15 +24,37 @@ import numpy as np
 seed_urls_file = "data/seeds.json"
 keywords_file = "data/keywords.json"
 summaries_file = "data/summaries.json"
+embed_cache_file = "data/emb_cache.sqlite3"
+onnx_model_dir = "data/minilm_onnx"
+embed_cache_max_entries = 200_000  # least recently used entries beyond this are evicted after each crawl
 
 max_depth = 2
 crawl_delay = 0.5
 max_pages_per_run = 20
-max_concurrent_requests = 3  # for future threading if needed
+checkpoint_every_pages = 10  # flush keywords/summaries to disk this often
+max_concurrent_requests = 3
+fetch_batch_size = max_concurrent_requests * 4  # URLs fetched concurrently per frontier slice
 
 # AI settings
 semantic_threshold = 0.4  # similarity threshold for following links
+# NOTE: 0.4 was tuned on fp32 embeddings and has not been re-checked against the int8 (quantize_model) outputs
 topic_text = "autonomous vehicles, self-driving cars, electric vehicles"  # main topic
+link_gate_terms = ["autonomous", "self-driving", "driverless", "robotaxi", "electric vehicle", "tesla", "waymo"]  # topic terms that, like tracked keywords, let a link through the pre-filter when mentioned
+max_encode_chars = 2000  # MiniLM truncates at 256 tokens (~1500 chars), so longer input is wasted tokenization
+min_sentence_chars = 20  # shorter fragments are nav/boilerplate, not summary material
+max_sentence_chars = 500
+embedding_model_name = "sentence-transformers/all-MiniLM-L6-v2"
+use_onnx = True  # encode through ONNX Runtime; False falls back to the PyTorch SentenceTransformer
+quantize_model = True  # ONNX: dynamic int8 graph; PyTorch: fp16 weights on GPU, dynamic int8 Linear layers on CPU
+
+# Sentence boundary pattern, compiled once for summarize_text
+sentence_split_re = re.compile(r'(?<=[.!?]) +')
+
+# URL slug and path separators read as spaces when matching keywords against links
+keyword_separators = str.maketrans("-_/", "   ")
+
+# Only the tags the crawler reads text and links from are built into the tree
+page_strainer = SoupStrainer(["title", "a", "p", "h1", "h2", "h3", "article"])
 
 # Thread lock
 lock = Lock()
@@ -47,117 +76,357 @@ def save_json(filepath, data):
 # -------------------------------
 # AI models initialization
 # -------------------------------
-print("🔧 Loading AI models...")
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-topic_embedding = embedding_model.encode(topic_text)
-kw_model = KeyBERT()
+# Models, their heavy libraries and the embedding cache load on first use, so
+# importing this module for the JSON utilities stays cheap
+@functools.lru_cache(maxsize=1)
+def get_embedding_model():
+    import torch
+    from sentence_transformers import SentenceTransformer
+    embedding_model = SentenceTransformer(embedding_model_name)
+    if quantize_model:
+        if embedding_model.device.type == "cuda":
+            embedding_model.half()
+        else:
+            embedding_model = torch.ao.quantization.quantize_dynamic(embedding_model, {torch.nn.Linear}, dtype=torch.qint8)
+    return embedding_model
+
+def replace_dir(src, dst):
+    """Moves a fully written directory into place, discarding any stale copy"""
+    shutil.rmtree(dst, ignore_errors=True)
+    os.replace(src, dst)
+
+@functools.lru_cache(maxsize=1)
+def get_onnx_encoder():
+    """Tokenizer and ONNX Runtime MiniLM graph, exported (and quantized) once and reused from onnx_model_dir"""
+    from onnxruntime import SessionOptions, GraphOptimizationLevel
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+    so = SessionOptions()
+    so.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+    # Exports are written to a scratch directory and moved into place only once
+    # complete, so an interrupted run never leaves a directory without its model
+    if not os.path.exists(os.path.join(onnx_model_dir, "model.onnx")):
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(onnx_model_dir))
+        AutoTokenizer.from_pretrained(embedding_model_name).save_pretrained(tmp_dir)
+        ORTModelForFeatureExtraction.from_pretrained(embedding_model_name, export=True).save_pretrained(tmp_dir)
+        replace_dir(tmp_dir, onnx_model_dir)
+    model_dir, file_name = onnx_model_dir, "model.onnx"
+    if quantize_model:
+        model_dir, file_name = f"{onnx_model_dir}_int8", "model_quantized.onnx"
+        if not os.path.exists(os.path.join(model_dir, file_name)):
+            tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(model_dir))
+            qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            ORTQuantizer.from_pretrained(onnx_model_dir).quantize(save_dir=tmp_dir, quantization_config=qconfig)
+            replace_dir(tmp_dir, model_dir)
+    tokenizer = AutoTokenizer.from_pretrained(onnx_model_dir)
+    ort_model = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name=file_name, provider="CPUExecutionProvider", session_options=so)
+    return tokenizer, ort_model
+
+def mean_pool(token_embeddings, attention_mask):
+    """Averages token embeddings over the non-padding positions"""
+    mask = attention_mask[..., None].astype(np.float32)
+    return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+def encode_texts(texts, batch_size=64):
+    """Encodes texts to L2-normalized float32 embeddings with the configured backend"""
+    if not use_onnx:
+        return get_embedding_model().encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+    tokenizer, ort_model = get_onnx_encoder()
+    chunks = []
+    for start in range(0, len(texts), batch_size):
+        # MiniLM was trained with a 256-token window, matching the SentenceTransformer config
+        inputs = tokenizer(texts[start:start + batch_size], padding=True, truncation=True, max_length=256, return_tensors="np")
+        outputs = ort_model(**inputs)
+        chunks.append(mean_pool(outputs.last_hidden_state, inputs["attention_mask"]))
+    embs = np.concatenate(chunks).astype(np.float32)
+    return embs / np.linalg.norm(embs, axis=1, keepdims=True)
+
+@functools.lru_cache(maxsize=1)
+def get_topic_embedding():
+    return encode_texts([topic_text])[0]
+
+@functools.lru_cache(maxsize=1)
+def get_kw_model():
+    from keybert import KeyBERT
+    from keybert.backend import BaseEmbedder
+
+    class OnnxEmbedder(BaseEmbedder):
+        """KeyBERT backend that embeds documents and candidate phrases through encode_texts"""
+        def embed(self, documents, verbose=False):
+            return encode_texts(list(documents))
+
+    return KeyBERT(model=OnnxEmbedder() if use_onnx else get_embedding_model())
+
+@functools.lru_cache(maxsize=1)
+def get_embed_cache():
+    """SQLite-backed embedding cache keyed by content hash, reused across runs"""
+    # Used from the event loop, the page worker and atexit, so the connection is
+    # not bound to the opening thread; access is serialized with lock instead
+    conn = sqlite3.connect(embed_cache_file, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, last_used REAL NOT NULL, vector BLOB NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+    atexit.register(conn.close)
+    return conn
+
+@functools.lru_cache(maxsize=1)
+def get_embedding_variant():
+    """Identifies the model, backend and precision producing embeddings, so cached vectors never mix"""
+    if use_onnx:
+        return f"{embedding_model_name}|onnx|{'int8' if quantize_model else 'fp32'}"
+    model = get_embedding_model()
+    precision = "fp32"
+    if quantize_model:
+        precision = "fp16" if model.device.type == "cuda" else "int8"
+    return f"{embedding_model_name}|torch|{precision}"
+
+def trim_embed_cache():
+    """Evicts least recently used embeddings beyond embed_cache_max_entries"""
+    conn = get_embed_cache()
+    with lock, conn:
+        conn.execute("DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (embed_cache_max_entries,))
 
 # -------------------------------
 # Helper functions
 # -------------------------------
-def extract_keywords(text, top_n=10):
-    """Extracts keywords from text using KeyBERT"""
-    return [kw[0].lower() for kw in kw_model.extract_keywords(text, keyphrase_ngram_range=(1,2), stop_words='english', top_n=top_n)]
+def extract_keywords(text, top_n=10, doc_embedding=None):
+    """Extracts keywords from text using KeyBERT, reusing a precomputed document embedding if given"""
+    doc_embeddings = None if doc_embedding is None else doc_embedding.reshape(1, -1)
+    return [kw[0].lower() for kw in get_kw_model().extract_keywords(text, keyphrase_ngram_range=(1,2), stop_words='english', top_n=top_n, doc_embeddings=doc_embeddings)]
+
+def cached_encode(texts, batch_size=64):
+    """Encodes texts to normalized embeddings, only running the model on cache misses"""
+    conn = get_embed_cache()
+    variant = get_embedding_variant()
+    keys = [f"{variant}|{hashlib.blake2b(t.encode(), digest_size=16).hexdigest()}" for t in texts]
+    found = {}
+    with lock:
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            found.update(conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+    embs = [found.get(k) for k in keys]
+    missing = [i for i, e in enumerate(embs) if e is None]
+    if missing:
+        new_embs = encode_texts([texts[i] for i in missing], batch_size=batch_size)
+        for i, emb in zip(missing, new_embs):
+            embs[i] = emb.tobytes()
+    now = time.time()
+    with lock, conn:
+        conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", [(keys[i], now, embs[i]) for i in missing])
+    return np.stack([np.frombuffer(e, dtype=np.float32) for e in embs])
 
 def semantic_similarity(text):
     """Computes similarity between text and main topic"""
-    emb = embedding_model.encode(text)
-    sim = util.cos_sim(emb, topic_embedding)
-    return sim.item()
+    return float(cached_encode([text])[0] @ get_topic_embedding())
+
+def batch_similarity(texts, batch_size=64):
+    """Computes similarity between each text and main topic in one batched encode"""
+    if not texts:
+        return np.zeros(0, dtype=np.float32)
+    return cached_encode(texts, batch_size=batch_size) @ get_topic_embedding()
+
+def build_keyword_automaton(keywords):
+    """Builds an Aho-Corasick automaton matching any of the keywords as substrings"""
+    automaton = ahocorasick.Automaton()
+    for kw in keywords:
+        kw = kw.lower().translate(keyword_separators)
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+def mentions_keyword(automaton, text):
+    """Checks whether lowercased text mentions a keyword as a whole word, allowing plurals"""
+    text = text.translate(keyword_separators)
+
+    def is_boundary(i):
+        return i < 0 or i >= len(text) or not text[i].isalnum()
 
-def summarize_text(text, n_sentences=3):
+    for end, kw in automaton.iter(text):
+        start, right = end - len(kw) + 1, end + 1
+        if not is_boundary(start - 1):
+            continue
+        if is_boundary(right) or any(text.startswith(suffix, right) and is_boundary(right + len(suffix)) for suffix in ("s", "'s")):
+            return True
+    return False
+
+def split_sentences(text):
+    """Splits text into sentences on terminal punctuation, dropping fragments and run-ons"""
+    return [s for s in sentence_split_re.split(text) if min_sentence_chars <= len(s) <= max_sentence_chars]
+
+def summarize_text(text, n_sentences=3, sentence_scores=None):
     """Simple extractive summary using top TF-IDF-like sentences"""
-    sentences = re.split(r'(?<=[.!?]) +', text)
+    sentences = split_sentences(text)
     if len(sentences) <= n_sentences:
-        return text
-    # Compute simple score: sentence similarity to topic
-    scores = [semantic_similarity(s) for s in sentences]
-    top_idx = np.argsort(scores)[-n_sentences:]
+        # Too few usable sentences to rank; never fall back to the raw page (nav text included)
+        return ' '.join(sentences) if sentences else text[:max_sentence_chars]
+    # Compute simple score: sentence similarity to topic, unless already scored by the caller
+    scores = sentence_scores if sentence_scores is not None else batch_similarity(sentences, batch_size=64)
+    top_idx = np.argpartition(scores, -n_sentences)[-n_sentences:]
     summary = ' '.join([sentences[i] for i in sorted(top_idx)])
     return summary
 
 # -------------------------------
 # Crawler
 # -------------------------------
-def crawl(seed_urls, max_depth=2, max_pages=None):
+async def crawl_async(seed_urls, max_depth=2, max_pages=None):
     queue = deque([(url, 0) for url in seed_urls])
+    enqueued = set(seed_urls)  # dedupe at enqueue so duplicates never reach scoring
     visited = set()
     discovered_domains = set(urlparse(u).netloc for u in seed_urls)
     all_keywords = load_json(keywords_file, [])
+    keyword_set = set(all_keywords)  # O(1) membership alongside the ordered list
+    keyword_automaton = build_keyword_automaton(keyword_set.union(link_gate_terms))
     summaries = load_json(summaries_file, {})
 
+    # Per-domain politeness: one in-flight request and crawl_delay between hits
+    domain_locks = defaultdict(asyncio.Semaphore)
+    domain_next_allowed = {}
+
     pages_crawled = 0
 
-    while queue and (max_pages is None or pages_crawled < max_pages):
-        url, depth = queue.popleft()
-        if url in visited or depth > max_depth:
-            continue
-        visited.add(url)
-        try:
-            print(f"🕷️ Crawling ({depth}) -> {url}")
-            r = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-            if r.status_code != 200:
-                print(f"❌ Failed: {r.status_code}")
-                continue
+    def save_progress():
+        with lock:
+            save_json(keywords_file, all_keywords)
+            save_json(summaries_file, summaries)
+
+    async def fetch(client, url):
+        """Fetches a URL, serializing requests per domain and honoring crawl_delay"""
+        domain = urlparse(url).netloc
+        async with domain_locks[domain]:
+            await asyncio.sleep(max(0, domain_next_allowed.get(domain, 0) - time.monotonic()))
+            try:
+                return await client.get(url)
+            finally:
+                domain_next_allowed[domain] = time.monotonic() + crawl_delay
+
+    def process_page(url, depth, content):
+        """Extracts keywords, summary and follow-up links from a fetched page; returns whether it was relevant"""
+        nonlocal keyword_automaton
+        soup = BeautifulSoup(content, "lxml", parse_only=page_strainer)
+        page_text = soup.get_text(separator=' ', strip=True)
+
+        # Semantic relevance check
+        page_embedding = cached_encode([page_text[:max_encode_chars]])[0]
+        sim = float(page_embedding @ get_topic_embedding())
+        if sim < semantic_threshold:
+            print(f"⚠️ Page not relevant (sim={sim:.2f})")
+            return False
 
-            soup = BeautifulSoup(r.text, "html.parser")
-            page_text = soup.get_text(separator=' ', strip=True)
+        # Extract keywords and update global list
+        kws = extract_keywords(page_text, doc_embedding=page_embedding)
+        with lock:
+            new_kws = [k for k in kws if k not in keyword_set]
+            if new_kws:
+                keyword_set.update(new_kws)
+                keyword_automaton = build_keyword_automaton(keyword_set.union(link_gate_terms))
+                all_keywords.extend(new_kws)
+                print(f"🔍 New keywords: {new_kws}")
 
-            # Semantic relevance check
-            sim = semantic_similarity(page_text)
-            if sim < semantic_threshold:
-                print(f"⚠️ Page not relevant (sim={sim:.2f})")
+        # Extract links worth scoring: keep only those mentioning a known
+        # keyword or pointing at a domain we haven't explored yet
+        page_links = {}
+        for link_tag in soup.find_all("a", href=True):
+            href = urljoin(url, link_tag["href"])
+            if urlparse(href).scheme not in ["http", "https"] or href in enqueued or href in visited:
                 continue
+            link_text = link_tag.get_text(" ", strip=True)
+            # Anchors sharing an href (e.g. image + headline) are scored once on their combined text
+            page_links[href] = f"{page_links[href]} {link_text}".strip() if href in page_links else link_text
+        candidates = [
+            (href, link_text) for href, link_text in page_links.items()
+            if urlparse(href).netloc not in discovered_domains or mentions_keyword(keyword_automaton, f"{link_text} {href}".lower())
+        ]
 
-            # Extract keywords and update global list
-            kws = extract_keywords(page_text)
-            with lock:
-                new_kws = [k for k in kws if k not in all_keywords]
-                if new_kws:
-                    all_keywords.extend(new_kws)
-                    save_json(keywords_file, all_keywords)
-                    print(f"🔍 New keywords: {new_kws}")
-
-            # Generate summary
-            summary = summarize_text(page_text)
-            with lock:
-                summaries[url] = summary
-                save_json(summaries_file, summaries)
-                print(f"📝 Summary saved ({len(summary)} chars)")
-
-            # Extract links and decide which to follow
-            for link_tag in soup.find_all("a", href=True):
-                href = urljoin(url, link_tag["href"])
-                parsed = urlparse(href)
-                if parsed.scheme not in ["http", "https"]:
-                    continue
-                domain = parsed.netloc
-                link_text = link_tag.get_text(" ", strip=True)
-                combined_text = f"{link_text} {href}"
-
-                # Semantic check on link text
-                if semantic_similarity(combined_text) >= semantic_threshold:
-                    if domain not in discovered_domains:
-                        discovered_domains.add(domain)
-                        seed_urls.append(href)  # update seed list dynamically
-                    queue.append((href, depth + 1))
-
-            pages_crawled += 1
-            time.sleep(crawl_delay)
-
-        except Exception as e:
-            print(f"❌ Error crawling {url}: {e}")
-            continue
+        # Score sentences and link texts together in a single encode
+        sentences = split_sentences(page_text)
+        link_texts = [f"{link_text} {href}" for href, link_text in candidates]
+        scores = batch_similarity(sentences + link_texts, batch_size=128)
+        sentence_scores, sims = scores[:len(sentences)], scores[len(sentences):]
+
+        # Generate summary
+        summary = summarize_text(page_text, sentence_scores=sentence_scores)
+        with lock:
+            summaries[url] = summary
+            print(f"📝 Summary recorded ({len(summary)} chars)")
+
+        # Decide which links to follow
+        for (href, _), link_sim in zip(candidates, sims):
+            if link_sim >= semantic_threshold:
+                domain = urlparse(href).netloc
+                if domain not in discovered_domains:
+                    discovered_domains.add(domain)
+                    seed_urls.append(href)  # update seed list dynamically
+                enqueued.add(href)
+                queue.append((href, depth + 1))
+        return True
+
+    loop = asyncio.get_running_loop()
+    transport = httpx.AsyncHTTPTransport(retries=2, limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+    try:
+        # A single worker keeps parsing and encoding off the event loop, so
+        # fetches stay in flight, while crawl state is mutated from one thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            async with httpx.AsyncClient(transport=transport, timeout=10, follow_redirects=True, headers={'User-Agent': 'Mozilla/5.0'}) as client:
+                while queue and (max_pages is None or pages_crawled < max_pages):
+                    # Drain the next slice of the frontier and fetch it concurrently
+                    batch = []
+                    batch_urls = set()
+                    while queue and len(batch) < fetch_batch_size:
+                        url, depth = queue.popleft()
+                        if url in visited or url in batch_urls or depth > max_depth:
+                            continue
+                        batch_urls.add(url)
+                        batch.append((url, depth))
+                    tasks = [asyncio.create_task(fetch(client, url)) for url, _ in batch]
+
+                    for (url, depth), task in zip(batch, tasks):
+                        if max_pages is not None and pages_crawled >= max_pages:
+                            break
+                        # Only URLs actually processed count as visited; fetches cancelled
+                        # below once the budget is spent are not
+                        visited.add(url)
+                        try:
+                            print(f"🕷️ Crawling ({depth}) -> {url}")
+                            r = await task
+                            if r.status_code != 200:
+                                print(f"❌ Failed: {r.status_code}")
+                                continue
 
-    # Save updated seeds for next run
-    save_json(seed_urls_file, seed_urls)
+                            if await loop.run_in_executor(executor, process_page, url, depth, r.content):
+                                pages_crawled += 1
+                                if pages_crawled % checkpoint_every_pages == 0:
+                                    save_progress()
+
+                        except Exception as e:
+                            print(f"❌ Error crawling {url}: {e}")
+                            continue
+
+                    # Drop fetches left over once the page budget is spent
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        # Flush results and updated seeds for next run
+        save_progress()
+        save_json(seed_urls_file, seed_urls)
+        trim_embed_cache()
     print(f"🏁 Crawl finished. Pages crawled: {pages_crawled}, Keywords tracked: {len(all_keywords)}")
     return visited, all_keywords, summaries
 
+def crawl(seed_urls, max_depth=2, max_pages=None):
+    """Runs the async crawler to completion"""
+    return asyncio.run(crawl_async(seed_urls, max_depth=max_depth, max_pages=max_pages))
+
 # -------------------------------
 # Main execution
 # -------------------------------
 if __name__ == "__main__":
+    print("🔧 Loading AI models...")
+    get_topic_embedding()
+    get_kw_model()
     print("🔧 Loading seeds...")
     seed_urls = load_json(seed_urls_file, [
         "https://techcrunch.com/tag/autonomous-vehicles/",